@@ -1,7 +1,10 @@
 import os
+import json
 import requests
 from dotenv import load_dotenv
 from rag.rag_utils import search_top_chunks
+from backend.judge_artifact import MANIFEST_NAME, checksums_requested, load_manifest, verify_manifest
+from backend.judge_workers import LocalJudgePool
 import time 
 
 load_dotenv()  # Load CHATGROQ_API_KEY from .env
@@ -14,42 +17,110 @@ USE_LOCAL_MODEL = os.getenv("USE_LOCAL_JUDGE", "false").lower() in ("1","true","
 _local_model = None
 _local_tok = None
 
+# KV caches of recent shared prompt prefixes (the enriched case block), LRU-ordered
+import copy
+import threading
+from collections import OrderedDict
+PREFIX_CACHE_SIZE = int(os.getenv("JUDGE_PREFIX_CACHE_SIZE", "4"))
+_prefix_cache = OrderedDict()
+_prefix_cache_lock = threading.Lock()
+
+# Optional pool of forked workers sharing the loaded weights copy-on-write
+import atexit
+LOCAL_WORKERS = int(os.getenv("JUDGE_WORKERS", "0"))
+WORKER_TIMEOUT = float(os.getenv("JUDGE_WORKER_TIMEOUT", "600"))
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+# Thread count before any pinning below; in-process callers restore it
+DEFAULT_TORCH_THREADS = torch.get_num_threads()
+if USE_LOCAL_MODEL and LOCAL_WORKERS > 1 and LocalJudgePool.supported():
+    # The pool forks after the model is loaded; the parent must never have run a
+    # multi-threaded torch region by then or OpenMP can hang in the children.
+    # The parent only loads weights, the workers set their own thread counts.
+    torch.set_num_threads(1)
+
+def _download_judge(repo_id):
+    """Return a local snapshot of repo_id, avoiding the network when possible.
+
+    If a cached snapshot matches its judge_manifest.json it is used as-is.
+    Otherwise only the manifest is fetched first and then just the files it
+    lists, so training leftovers in the repo are never downloaded. Repos
+    without a manifest fall back to a full snapshot.
+    """
+    from huggingface_hub import hf_hub_download, snapshot_download
+    token = os.getenv("HF_TOKEN")  # Optional: for private models
+
+    try:
+        cached = snapshot_download(repo_id=repo_id, token=token, local_files_only=True)
+        if load_manifest(cached) is not None and not verify_manifest(cached, checksums=checksums_requested()):
+            print(f"✅ Cached model matches manifest, skipping download: {cached}")
+            return cached
+    except Exception:
+        pass  # Nothing cached yet
+
+    try:
+        manifest_path = hf_hub_download(repo_id=repo_id, filename=MANIFEST_NAME, token=token)
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            allow_patterns = [MANIFEST_NAME] + list(json.load(f)["files"])
+    except Exception:
+        allow_patterns = None  # Legacy repo without a manifest
+    local_path = snapshot_download(repo_id=repo_id, token=token, allow_patterns=allow_patterns)
+    if allow_patterns is not None:
+        problems = verify_manifest(local_path, checksums=True)
+        if problems:
+            raise RuntimeError(f"Downloaded model does not match manifest: {', '.join(problems)}")
+    return local_path
+
+
 def _ensure_local():
     """Lazily load the base model plus LoRA adapter once and cache globally.
-    Supports both local paths and HuggingFace Hub model IDs."""
+    Supports both local paths and HuggingFace Hub model IDs, and artifacts
+    built by scripts/build_judge_artifact.py (adapter-only or merged)."""
     global _local_model, _local_tok
     if _local_model is None:
         adapter_path = os.getenv("JUDGE_LORA_PATH", "judge-lora")
         
-        # Check if it's a HuggingFace Hub model ID (contains /)
-        if "/" in adapter_path:
-            print(f"🌐 Downloading model from HuggingFace Hub: {adapter_path}")
-            # HuggingFace Hub will automatically cache the model
-            from huggingface_hub import snapshot_download
+        # Check if it's a HuggingFace Hub model ID (contains /) rather than a local dir
+        if "/" in adapter_path and not os.path.isdir(adapter_path):
+            print(f"🌐 Resolving model from HuggingFace Hub: {adapter_path}")
             try:
-                # Download model if not cached
-                local_path = snapshot_download(
-                    repo_id=adapter_path,
-                    token=os.getenv("HF_TOKEN")  # Optional: for private models
-                )
-                adapter_path = local_path
-                print(f"✅ Model downloaded to: {adapter_path}")
+                adapter_path = _download_judge(adapter_path)
+                print(f"✅ Model available at: {adapter_path}")
+                manifest = load_manifest(adapter_path)
             except Exception as e:
                 print(f"❌ Failed to download model from HuggingFace: {e}")
                 print("💡 Tip: Make sure the model exists and you have access")
                 raise
         else:
             print(f"📁 Loading local model from: {adapter_path}")
+            manifest = load_manifest(adapter_path)
+            if manifest is not None:
+                problems = verify_manifest(adapter_path, manifest, checksums=checksums_requested())
+                if problems:
+                    raise RuntimeError(f"Local model does not match manifest: {', '.join(problems)}")
         
         try:
-            cfg = PeftConfig.from_pretrained(adapter_path)
-            base = AutoModelForCausalLM.from_pretrained(
-                cfg.base_model_name_or_path,
-                torch_dtype="auto",
-                device_map="auto" if torch.cuda.is_available() else None,
-            )
-            _local_model = PeftModel.from_pretrained(base, adapter_path)
-            _local_tok = AutoTokenizer.from_pretrained(cfg.base_model_name_or_path)
+            dtype = "auto"
+            if manifest is not None and manifest.get("dtype") != "float32" and not torch.cuda.is_available():
+                # Half-precision artifacts are stored small but run in float32 on CPU
+                dtype = torch.float32
+            device_map = "auto" if torch.cuda.is_available() else None
+            if manifest is not None and manifest["kind"] == "merged":
+                _local_model = AutoModelForCausalLM.from_pretrained(
+                    adapter_path, torch_dtype=dtype, device_map=device_map,
+                )
+                _local_tok = AutoTokenizer.from_pretrained(adapter_path)
+            else:
+                cfg = PeftConfig.from_pretrained(adapter_path)
+                base = AutoModelForCausalLM.from_pretrained(
+                    cfg.base_model_name_or_path,
+                    torch_dtype=dtype,
+                    device_map=device_map,
+                )
+                _local_model = PeftModel.from_pretrained(base, adapter_path)
+                # Artifacts ship the tokenizer, so no base-model tokenizer download is needed
+                tok_source = adapter_path if manifest is not None else cfg.base_model_name_or_path
+                _local_tok = AutoTokenizer.from_pretrained(tok_source)
             print("✅ Model loaded successfully")
         except Exception as e:
             print(f"❌ Error loading model: {e}")
@@ -67,21 +138,105 @@ def fill_prompt(template, **kwargs):
         template = template.replace(f"{{{key}}}", value)
     return template
 
+# Longest common prefix of filled prompts, cut back to a line boundary
+def shared_prefix(*prompts):
+    common = os.path.commonprefix(prompts)
+    return common[:common.rfind("\n") + 1]
+
+def _prefix_kv(prefix, prefix_ids):
+    """Return the KV cache for prefix, computing it once and keeping an LRU of recent ones.
+
+    Concurrent Streamlit sessions share the cache, so lookups, inserts and
+    evictions hold _prefix_cache_lock; the prefill itself runs outside it.
+    Cached entries are never mutated (callers deep-copy them before generate).
+    """
+    with _prefix_cache_lock:
+        kv = _prefix_cache.get(prefix)
+        if kv is not None:
+            _prefix_cache.move_to_end(prefix)
+            return kv
+    with torch.no_grad():
+        kv = _local_model(input_ids=prefix_ids, use_cache=True).past_key_values
+    with _prefix_cache_lock:
+        _prefix_cache[prefix] = kv
+        _prefix_cache.move_to_end(prefix)
+        while len(_prefix_cache) > PREFIX_CACHE_SIZE:
+            _prefix_cache.popitem(last=False)
+    return kv
+
+def _local_generate(prompt: str, prefix: str = ""):
+    """Generate with the local model, reusing the prefill of a shared prompt prefix.
+
+    When prompt starts with prefix, the prefix is tokenized on its own and its
+    KV cache is computed once; generate() then only prefills the remaining
+    tokens. A copy of the cache is passed in because generate() extends it.
+    """
+    _ensure_local()
+    max_length = _local_tok.model_max_length
+    if prefix and PREFIX_CACHE_SIZE > 0 and prompt.startswith(prefix):
+        prefix_ids = _local_tok(prefix, return_tensors="pt").input_ids.to(_local_model.device)
+        suffix_ids = _local_tok(
+            prompt[len(prefix):], return_tensors="pt", add_special_tokens=False
+        ).input_ids.to(_local_model.device)
+        # Fall back to the plain path when the prompt would need truncating
+        if suffix_ids.shape[1] > 0 and prefix_ids.shape[1] + suffix_ids.shape[1] <= max_length:
+            past = copy.deepcopy(_prefix_kv(prefix, prefix_ids))
+            input_ids = torch.cat([prefix_ids, suffix_ids], dim=1)
+            out = _local_model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past,
+                max_new_tokens=512,
+                temperature=0.7,
+            )
+            return _local_tok.decode(out[0], skip_special_tokens=True)
+
+    inputs = _local_tok(
+        prompt,
+        return_tensors="pt",
+        truncation=True,
+        max_length=max_length
+    ).to(_local_model.device)
+    out = _local_model.generate(**inputs, max_new_tokens=512, temperature=0.7)
+    return _local_tok.decode(out[0], skip_special_tokens=True)
+
+def _ensure_pool():
+    """Start the local worker pool once, after the parent has loaded the model."""
+    global _worker_pool, LOCAL_WORKERS
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            if not LocalJudgePool.supported():
+                print("⚠️ JUDGE_WORKERS needs fork() and a CPU-only model; generating in-process")
+                LOCAL_WORKERS = 0
+                return None
+            _ensure_local()
+            _local_model.eval()
+            _worker_pool = LocalJudgePool(_local_generate, LOCAL_WORKERS)
+            atexit.register(_worker_pool.close)
+    return _worker_pool
+
+def _run_local(prompt: str, prefix: str = ""):
+    """Run local generation in the worker pool when JUDGE_WORKERS > 1, otherwise in-process."""
+    if LOCAL_WORKERS > 1:
+        pool = _ensure_pool()
+        if pool is not None:
+            return pool.submit(prompt, prefix).result(timeout=WORKER_TIMEOUT)
+    return _local_generate(prompt, prefix)
+
 # Call LLM (local LoRA if enabled, otherwise Groq API)
 import time
 
-def call_llm(prompt: str, model: str = "llama-3.3-70b-versatile", retries: int = 3):
-    """Generate a response using either the local LoRA-fine-tuned model or the remote Groq endpoint."""
+def call_llm(prompt: str, model: str = "llama-3.3-70b-versatile", retries: int = 3, prefix: str = "",
+             max_tokens: int = 300, usage: dict = None):
+    """Generate a response using either the local LoRA-fine-tuned model or the remote Groq endpoint.
+
+    prefix is a leading part of prompt shared with other calls; the local model
+    reuses its KV cache across them. The remote path ignores it. max_tokens
+    caps the remote completion, and a dict passed as usage is filled with the
+    remote response's token usage (e.g. completion_tokens).
+    """
     if USE_LOCAL_MODEL:
-        _ensure_local()
-        inputs = _local_tok(
-            prompt,
-            return_tensors="pt",
-            truncation=True,
-            max_length=_local_tok.model_max_length
-        ).to(_local_model.device)
-        out = _local_model.generate(**inputs, max_new_tokens=512, temperature=0.7)
-        return _local_tok.decode(out[0], skip_special_tokens=True)
+        return _run_local(prompt, prefix)
 
     # --- Remote fallback (Groq) ---
     api_key = os.getenv("CHATGROQ_API_KEY")
@@ -102,7 +257,7 @@ def call_llm(prompt: str, model: str = "llama-3.3-70b-versatile", retries: int =
         "model": model,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.3,  # Lower temperature for more focused output
-        "max_tokens": 300,  # Reduced token limit
+        "max_tokens": max_tokens,  # Reduced token limit
         "frequency_penalty": 1.5,  # Strongly penalize repetition
         "presence_penalty": 1.0,  # Encourage topic diversity
         "stop": ["\n\n\n", "---", "CASE:", "You are"]
@@ -112,7 +267,10 @@ def call_llm(prompt: str, model: str = "llama-3.3-70b-versatile", retries: int =
         response = requests.post(endpoint, headers=headers, json=data)
 
         if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
+            body = response.json()
+            if usage is not None:
+                usage.update(body.get('usage') or {})
+            return body['choices'][0]['message']['content']
         elif response.status_code == 429:
             # Rate limited — wait and retry
             print("⏳ Rate limited. Waiting before retrying...")
@@ -129,15 +287,7 @@ def call_hybrid_judge(prompt: str, model: str = "llama-3.3-70b-versatile", retri
     finetuned_response = None
     if USE_LOCAL_MODEL:
         try:
-            _ensure_local()
-            inputs = _local_tok(
-            prompt,
-            return_tensors="pt",
-            truncation=True,
-            max_length=_local_tok.model_max_length
-        ).to(_local_model.device)
-            out = _local_model.generate(**inputs, max_new_tokens=512, temperature=0.7)
-            finetuned_response = _local_tok.decode(out[0], skip_special_tokens=True)
+            finetuned_response = _run_local(prompt)
             print("🔧 Fine-tuned model response obtained")
         except Exception as e:
             print(f"⚠️ Fine-tuned model failed: {e}")
@@ -242,11 +392,13 @@ def run_courtroom(case):
     enriched_case = f"CASE:\n{case}\n\nLEGAL REFERENCES (if any):\n{evidence}"
 
     # Step 3: Generate prosecution and defense arguments
+    # Both templates open with {case}, so the local model prefills it only once
     prosecution_prompt = fill_prompt(prosecution_template, case=enriched_case)
     defense_prompt = fill_prompt(defense_template, case=enriched_case)
+    case_prefix = shared_prefix(prosecution_prompt, defense_prompt)
 
-    prosecution = call_llm(prosecution_prompt)
-    defense = call_llm(defense_prompt)
+    prosecution = call_llm(prosecution_prompt, prefix=case_prefix)
+    defense = call_llm(defense_prompt, prefix=case_prefix)
 
     # Step 4: Generate verdict from judge using hybrid logic
     judge_prompt = fill_prompt(judge_template, prosecution=prosecution, defense=defense, context=evidence)
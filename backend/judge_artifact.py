@@ -0,0 +1,95 @@
+"""Manifest helpers for the deployable judge artifact.
+
+The artifact built by scripts/build_judge_artifact.py contains only what
+inference needs (adapter or merged weights, tokenizer files) plus a
+judge_manifest.json listing every file with its size and sha256. The loader
+uses the manifest to check a local copy and skip network calls when it is
+complete; the sha256s are checked after a download, and on every start only
+when JUDGE_VERIFY_CHECKSUMS is set.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = "judge_manifest.json"
+
+# Files inference needs from an adapter or merged-model directory
+TOKENIZER_FILES = (
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "special_tokens_map.json",
+    "vocab.json",
+    "merges.txt",
+    "tokenizer.model",
+    "added_tokens.json",
+)
+
+
+def sha256_file(path):
+    """Return the hex sha256 of a file, read in 1 MB blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_manifest(artifact_dir, kind, base_model, dtype):
+    """Checksum every file in artifact_dir and write the manifest next to them."""
+    files = {}
+    for root, _, names in os.walk(artifact_dir):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, artifact_dir).replace(os.sep, "/")
+            if rel == MANIFEST_NAME:
+                continue
+            files[rel] = {"size": os.path.getsize(path), "sha256": sha256_file(path)}
+    manifest = {
+        "kind": kind,  # "adapter" or "merged"
+        "base_model": base_model,
+        "dtype": dtype,
+        "files": files,
+    }
+    with open(os.path.join(artifact_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(artifact_dir):
+    """Return the parsed manifest in artifact_dir, or None if there is none."""
+    path = os.path.join(artifact_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_manifest(artifact_dir, manifest=None, checksums=False):
+    """Return a list of problems with artifact_dir against its manifest.
+
+    An empty list means every listed file is present with the recorded size
+    (and, with checksums=True, the recorded sha256). The size check is cheap
+    enough for every start; hashing reads every weight file, so it is done
+    after a download or when JUDGE_VERIFY_CHECKSUMS is set.
+    """
+    manifest = manifest or load_manifest(artifact_dir)
+    if manifest is None:
+        return [f"{MANIFEST_NAME} missing"]
+    problems = []
+    for rel, meta in manifest["files"].items():
+        path = os.path.join(artifact_dir, rel)
+        if not os.path.exists(path):
+            problems.append(f"{rel} missing")
+        elif os.path.getsize(path) != meta["size"]:
+            problems.append(f"{rel} size mismatch")
+    if problems or not checksums:
+        return problems
+    for rel, meta in manifest["files"].items():
+        if sha256_file(os.path.join(artifact_dir, rel)) != meta["sha256"]:
+            problems.append(f"{rel} checksum mismatch")
+    return problems
+
+
+def checksums_requested():
+    """Whether JUDGE_VERIFY_CHECKSUMS asks for full sha256 checks on every start."""
+    return os.getenv("JUDGE_VERIFY_CHECKSUMS", "false").lower() in ("1", "true", "yes")
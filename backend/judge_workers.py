@@ -0,0 +1,186 @@
+"""Multi-process pool for local judge generation.
+
+The parent loads the model once and then forks the workers, so every child
+shares the weight pages copy-on-write instead of loading its own copy. Each
+worker gets an equal share of the CPU cores for torch intra-op threads.
+Requests carrying a shared prompt prefix are routed to the same worker so its
+prefix KV cache (see courtroom_logic._prefix_kv) is reused; others go round
+robin. Results come back through one queue and are matched to futures by a
+collector thread, so callers simply block on Future.result(timeout). The
+collector also notices workers that died (OOM-killed, segfaulted) and fails
+their outstanding futures instead of leaving callers waiting forever.
+
+Forking is only safe if the parent has not entered a multi-threaded torch
+(OpenMP) parallel region: the children would inherit a thread pool whose
+threads don't exist. Callers must therefore keep the parent at one intra-op
+thread (torch.set_num_threads(1)) before loading the model; each worker then
+raises its own thread count after the fork.
+"""
+import gc
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import zlib
+from concurrent.futures import Future
+
+import torch
+
+
+def _worker_main(generate_fn, threads, tasks, results):
+    """Child loop: run generate_fn for each (id, prompt, prefix) until a None sentinel."""
+    torch.set_num_threads(threads)
+    with torch.no_grad():
+        while True:
+            item = tasks.get()
+            if item is None:
+                break
+            req_id, prompt, prefix = item
+            try:
+                results.put((req_id, True, generate_fn(prompt, prefix)))
+            except Exception as e:
+                results.put((req_id, False, f"{type(e).__name__}: {e}"))
+
+
+def available_cpus():
+    """Return the cores this process may run on (respects affinity masks and cpusets)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _memory_kb(pid):
+    """Return (rss, pss) in kB for pid from /proc, or (None, None) if unavailable.
+
+    PSS splits shared pages between the processes mapping them, so summing it
+    across the pool gives the real footprint; summing RSS double-counts the
+    shared weights.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Rss"].split()[0]), int(fields["Pss"].split()[0])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+class LocalJudgePool:
+    """Fork workers that share the already-loaded local model and serve generate requests."""
+
+    def __init__(self, generate_fn, workers: int, threads_per_worker: int = None):
+        if not self.supported():
+            raise RuntimeError("Local judge workers need fork() and a CPU-only model")
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, available_cpus() // workers)
+        ctx = mp.get_context("fork")
+        self._results = ctx.Queue()
+        self._tasks = [ctx.Queue() for _ in range(workers)]
+        self._pending = {}  # req_id -> (future, worker index)
+        self._dead = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._next_worker = itertools.cycle(range(workers))
+        if torch.get_num_threads() > 1:
+            print("⚠️ Forking judge workers from a parent with multiple torch threads may hang OpenMP in the children")
+
+        # Move everything allocated so far out of the GC's reach so collections
+        # in the children don't touch (and un-share) those object pages
+        gc.collect()
+        gc.freeze()
+        self._procs = [
+            ctx.Process(
+                target=_worker_main,
+                args=(generate_fn, self.threads_per_worker, tasks, self._results),
+                daemon=True,
+            )
+            for tasks in self._tasks
+        ]
+        for proc in self._procs:
+            proc.start()
+        gc.unfreeze()
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        print(f"🧵 Started {workers} local judge workers x {self.threads_per_worker} threads")
+
+    @staticmethod
+    def supported():
+        """Fork-based sharing works on POSIX with the model on CPU (CUDA contexts cannot be forked)."""
+        return sys.platform != "win32" and "fork" in mp.get_all_start_methods() and not torch.cuda.is_available()
+
+    def submit(self, prompt: str, prefix: str = "") -> Future:
+        """Queue a generate request and return a Future for the decoded text."""
+        future = Future()
+        req_id = next(self._ids)
+        with self._lock:
+            alive = [i for i in range(self.workers) if i not in self._dead]
+            if not alive:
+                raise RuntimeError("All local judge workers have exited")
+            if prefix:
+                worker = alive[zlib.crc32(prefix.encode("utf-8")) % len(alive)]
+            else:
+                worker = next(i for i in self._next_worker if i not in self._dead)
+            self._pending[req_id] = (future, worker)
+        self._tasks[worker].put((req_id, prompt, prefix))
+        return future
+
+    def _collect(self):
+        while True:
+            # Checked every pass so a dead worker is noticed even while others keep answering
+            self._reap_dead_workers()
+            try:
+                item = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            req_id, ok, value = item
+            with self._lock:
+                future, _ = self._pending.pop(req_id, (None, None))
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(f"Local judge worker failed: {value}"))
+
+    def _reap_dead_workers(self):
+        """Fail the outstanding requests of any worker process that has exited."""
+        failed = []
+        with self._lock:
+            for i, proc in enumerate(self._procs):
+                if i in self._dead or proc.is_alive():
+                    continue
+                self._dead.add(i)
+                print(f"❌ Local judge worker-{i} exited with code {proc.exitcode}")
+                for req_id, (future, worker) in list(self._pending.items()):
+                    if worker == i:
+                        del self._pending[req_id]
+                        failed.append((future, proc.exitcode))
+        for future, exitcode in failed:
+            future.set_exception(RuntimeError(f"Local judge worker exited (code {exitcode}) before answering"))
+
+    def memory_report(self):
+        """Return per-process and total RSS/PSS in MB for the parent and its workers."""
+        rows = [("parent", os.getpid())] + [(f"worker-{i}", p.pid) for i, p in enumerate(self._procs)]
+        report = {}
+        for name, pid in rows:
+            rss, pss = _memory_kb(pid)
+            report[name] = {
+                "rss_mb": rss / 1024 if rss is not None else None,
+                "pss_mb": pss / 1024 if pss is not None else None,
+            }
+        pss = [r["pss_mb"] for r in report.values() if r["pss_mb"] is not None]
+        report["total_pss_mb"] = sum(pss) if pss else None
+        return report
+
+    def close(self):
+        """Stop the workers and the collector thread."""
+        for tasks in self._tasks:
+            tasks.put(None)
+        for proc in self._procs:
+            proc.join(timeout=10)
+        self._results.put(None)
+        self._collector.join(timeout=10)
@@ -0,0 +1,247 @@
+"""Build one FAISS index from a bulk corpus of PDFs (judgments, statutes, ...)
+using every core of the ingest machine.
+
+Pages are extracted in a process pool, each task opening its own PyMuPDF
+handle on a range of pages. As each document finishes it is chunked with its
+page spans and the chunks are fed through a bounded queue to embedding
+threads, so extraction and embedding overlap without holding the whole
+corpus in memory twice. The index is written in the layout search_top_chunks
+reads, with chunks in a stable order (sorted by document path, then position),
+plus a <index>.meta.json file giving each chunk's id, source and page span.
+Chunk ids are "<path relative to --root>#<n>", so they don't change when
+other documents are added. PDFs that fail to open or extract (corrupt,
+encrypted) are skipped and listed at the end instead of aborting the build.
+
+Usage:
+    python build_corpus_index.py corpus/ more_judgments/*.pdf --workers 32
+    python build_corpus_index.py --list pdfs.txt --index rag/embeddings/index.faiss
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def _page_count(pdf_path):
+    """Worker task: return (pdf_path, page count, error); error is a message or None."""
+    import fitz  # PyMuPDF
+
+    try:
+        with fitz.open(pdf_path) as doc:
+            if doc.needs_pass:
+                return pdf_path, 0, "encrypted"
+            return pdf_path, doc.page_count, None
+    except Exception as e:
+        return pdf_path, 0, f"{type(e).__name__}: {e}"
+
+
+def _extract_range(pdf_path, start, end):
+    """Worker task: open the PDF and return (pdf_path, start, texts of pages [start, end), error)."""
+    import fitz  # PyMuPDF
+
+    try:
+        with fitz.open(pdf_path) as doc:
+            return pdf_path, start, [doc[i].get_text() for i in range(start, end)], None
+    except Exception as e:
+        return pdf_path, start, [], f"{type(e).__name__}: {e}"
+
+
+def collect_pdfs(paths, list_file=None):
+    """Expand directories (recursively) and a list file into a sorted list of PDF paths."""
+    if list_file:
+        with open(list_file, "r", encoding="utf-8") as f:
+            paths = list(paths) + [line.strip() for line in f if line.strip()]
+    pdfs = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                pdfs.update(os.path.join(root, n) for n in names if n.lower().endswith(".pdf"))
+        elif path.lower().endswith(".pdf"):
+            pdfs.add(path)
+    return sorted(os.path.abspath(p) for p in pdfs)
+
+
+def source_id(pdf_path, root):
+    """Return the stable source name of a PDF: its path relative to root, or absolute if outside it."""
+    pdf_path, root = os.path.abspath(pdf_path), os.path.abspath(root)
+    if os.path.commonpath([pdf_path, root]) == root:
+        pdf_path = os.path.relpath(pdf_path, root)
+    return pdf_path.replace(os.sep, "/")
+
+
+def chunk_pages(pages, chunk_size=500):
+    """Chunk a document's pages like rag_utils.chunk_text, keeping each chunk's page span.
+
+    Returns (chunk, first_page, last_page) tuples; page numbers are 1-based.
+    """
+    words, page_of = [], []
+    for page_no, page_text in enumerate(pages, start=1):
+        page_words = page_text.split()
+        words.extend(page_words)
+        page_of.extend([page_no] * len(page_words))
+    return [
+        (" ".join(words[i:i + chunk_size]), page_of[i], page_of[min(i + chunk_size, len(words)) - 1])
+        for i in range(0, len(words), chunk_size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", help="PDF files or directories of PDFs")
+    parser.add_argument("--list", default=None, help="Text file with one PDF path per line")
+    parser.add_argument("--root", default=os.getcwd(),
+                        help="Chunk ids are PDF paths relative to this directory (default: current directory)")
+    parser.add_argument("--index", default=None, help="Output index path (default: rag/embeddings/index.faiss)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Extraction processes")
+    parser.add_argument("--embed_workers", type=int, default=2, help="Embedding threads")
+    parser.add_argument("--pages_per_task", type=int, default=16)
+    parser.add_argument("--batch_size", type=int, default=64, help="Chunks per embedding batch")
+    parser.add_argument("--queue_size", type=int, default=32, help="Max embedding batches waiting")
+    parser.add_argument("--chunk_size", type=int, default=500, help="Words per chunk")
+    args = parser.parse_args()
+
+    pdfs = collect_pdfs(args.paths, args.list)
+    if not pdfs:
+        parser.error("no PDF files found")
+
+    # Imported here so the spawned extraction processes don't each load the embedding model
+    from rag.rag_utils import INDEX_PATH, embedding_model, write_faiss_index
+    index_path = args.index or INDEX_PATH
+
+    embeddings = {}
+    embed_lock = threading.Lock()
+    embed_errors = []
+    batches = queue.Queue(maxsize=args.queue_size)
+
+    def embed_worker():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if embed_errors:
+                continue  # Drain the queue so the producer never blocks on a failed run
+            try:
+                vectors = embedding_model.encode([text for _, text in batch], normalize_embeddings=True)
+            except Exception as e:
+                with embed_lock:
+                    embed_errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with embed_lock:
+                for (chunk_id, _), vec in zip(batch, vectors):
+                    embeddings[chunk_id] = vec
+
+    def put_batch(batch):
+        # Time out periodically so a failed embedder stops the run instead of blocking it
+        while True:
+            if embed_errors:
+                raise RuntimeError(f"Embedding failed: {embed_errors[0]}")
+            try:
+                batches.put(batch, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+
+    embedders = [threading.Thread(target=embed_worker, daemon=True) for _ in range(args.embed_workers)]
+    for t in embedders:
+        t.start()
+
+    start = time.perf_counter()
+    chunks, meta, skipped = {}, {}, {}
+    pages_done = 0
+    total_pages = 0
+    last_report = start
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        with embed_lock:
+            embedded = len(embeddings)
+        label = "Done" if final else "Progress"
+        print(f"{label}: {pages_done}/{total_pages} pages ({pages_done / elapsed:.1f}/s), "
+              f"{embedded}/{len(chunks)} chunks embedded ({embedded / elapsed:.1f}/s)")
+
+    # spawn, not fork: the parent already runs embedding threads, and forking a
+    # multi-threaded process can leave locks held in the children
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context("spawn"))
+    try:
+        counts = {}
+        for pdf, n, error in pool.map(_page_count, pdfs):
+            if error:
+                skipped[pdf] = error
+                print(f"⚠️ Skipping {pdf}: {error}")
+            else:
+                counts[pdf] = n
+        total_pages = sum(counts.values())
+        print(f"Ingesting {len(counts)} PDFs, {total_pages} pages with {args.workers} extraction workers")
+
+        pending, pages, futures = {}, {}, []
+        for pdf, n in counts.items():
+            pages[pdf] = [None] * n
+            ranges = [(s, min(s + args.pages_per_task, n)) for s in range(0, n, args.pages_per_task)]
+            pending[pdf] = len(ranges)
+            futures.extend(pool.submit(_extract_range, pdf, s, e) for s, e in ranges)
+
+        for fut in as_completed(futures):
+            pdf, s, texts, error = fut.result()
+            if pdf in skipped:
+                continue
+            if error:
+                # Drop the whole document; its other page ranges are ignored as they arrive
+                skipped[pdf] = error
+                pages.pop(pdf, None)
+                print(f"⚠️ Skipping {pdf}: {error}")
+                continue
+            pages[pdf][s:s + len(texts)] = texts
+            pages_done += len(texts)
+            pending[pdf] -= 1
+            if pending[pdf] == 0:
+                # Document complete: chunk it and hand the chunks to the embedders
+                source = source_id(pdf, args.root)
+                doc_chunks = chunk_pages(pages.pop(pdf), args.chunk_size)
+                batch = []
+                for i, (text, first, last) in enumerate(doc_chunks):
+                    chunk_id = f"{source}#{i}"
+                    chunks[chunk_id] = text
+                    meta[chunk_id] = {"id": chunk_id, "source": source, "page_start": first, "page_end": last}
+                    batch.append((chunk_id, text))
+                    if len(batch) == args.batch_size:
+                        put_batch(batch)
+                        batch = []
+                if batch:
+                    put_batch(batch)
+            if time.perf_counter() - last_report >= 5:
+                report()
+                last_report = time.perf_counter()
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    for _ in embedders:
+        batches.put(None)
+    for t in embedders:
+        t.join()
+    if embed_errors:
+        raise RuntimeError(f"Embedding failed: {embed_errors[0]}")
+    report(final=True)
+    if skipped:
+        print(f"Skipped {len(skipped)} of {len(pdfs)} PDFs:")
+        for pdf, error in sorted(skipped.items()):
+            print(f"  {pdf}: {error}")
+
+    if not chunks:
+        print("No text extracted; index not written.")
+        return
+    # Stable order: by document path, then chunk position within the document
+    ids = sorted(chunks, key=lambda c: (c.rsplit("#", 1)[0], int(c.rsplit("#", 1)[1])))
+    write_faiss_index([embeddings[c] for c in ids], [chunks[c] for c in ids], index_path)
+    with open(index_path.replace(".faiss", ".meta.json"), "w", encoding="utf-8") as f:
+        json.dump([meta[c] for c in ids], f, indent=1)
+    print(f"✅ FAISS index with {len(ids)} chunks from {len(pdfs) - len(skipped)} PDFs written to {index_path}")
+
+
+if __name__ == "__main__":
+    main()
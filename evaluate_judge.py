@@ -0,0 +1,277 @@
+"""Evaluate a judge adapter on a held-out split of the JSONL written by
+prepare_dataset.py, reporting quality and speed side by side.
+
+Each record's system and user messages form the prompt and the assistant
+message is the reference judgment. Generations are scored with lexical
+overlap (ROUGE-1, ROUGE-L and token F1) and timed per sample.
+
+The local backend runs length-sorted batches through the PEFT model; the
+remote backend sends requests to Groq with bounded concurrency. Results are
+cached per (checkpoint, sample), so re-running after a change only evaluates
+the samples whose checkpoint or text changed.
+
+Usage:
+    python evaluate_judge.py --data judge_dataset.jsonl --adapter judge-lora
+    python evaluate_judge.py --backend remote --concurrency 4 --limit 50
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from judge_split import DEFAULT_EVAL_PERCENT, is_eval_record
+
+
+def load_split(path, eval_percent, limit=None):
+    """Return the held-out records of a prepare_dataset.py JSONL file.
+
+    The split is judge_split.is_eval_record, the same predicate
+    fine_tune_judge.py uses to leave these records out of training.
+    """
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            messages = json.loads(line)["messages"]
+            if not is_eval_record(messages, eval_percent):
+                continue
+            by_role = {m["role"]: m["content"] for m in messages}
+            prompt = f"System: {by_role.get('system', '')}\n\nUser: {by_role['user']}\n\nAssistant: "
+            sample_id = hashlib.sha256((prompt + "\0" + by_role["assistant"]).encode("utf-8")).hexdigest()[:16]
+            samples.append({"id": sample_id, "prompt": prompt, "reference": by_role["assistant"]})
+            if limit and len(samples) >= limit:
+                break
+    return samples
+
+
+# --- Lexical overlap metrics ---
+
+def _tokens(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def _f1(overlap, n_pred, n_ref):
+    if overlap == 0 or n_pred == 0 or n_ref == 0:
+        return 0.0
+    precision, recall = overlap / n_pred, overlap / n_ref
+    return 2 * precision * recall / (precision + recall)
+
+
+def _lcs_length(a, b):
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        cur = [0]
+        for j, y in enumerate(b):
+            cur.append(prev[j] + 1 if x == y else max(prev[j + 1], cur[j]))
+        prev = cur
+    return prev[-1]
+
+
+def overlap_scores(prediction, reference):
+    """Return ROUGE-1 F, ROUGE-L F and bag-of-words token F1 for one pair."""
+    pred, ref = _tokens(prediction), _tokens(reference)
+    pred_set, ref_set = set(pred), set(ref)
+    counts = {}
+    for t in ref:
+        counts[t] = counts.get(t, 0) + 1
+    matched = 0
+    for t in pred:
+        if counts.get(t, 0) > 0:
+            counts[t] -= 1
+            matched += 1
+    return {
+        "rouge1": _f1(matched, len(pred), len(ref)),
+        "rougeL": _f1(_lcs_length(pred, ref), len(pred), len(ref)),
+        "token_f1": _f1(len(pred_set & ref_set), len(pred_set), len(ref_set)),
+    }
+
+
+# --- Result cache ---
+
+def checkpoint_key(args):
+    """Fingerprint the model and generation settings that determine an output."""
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        "backend": args.backend,
+        "max_new_tokens": args.max_new_tokens,
+        "model": os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile") if args.backend == "remote" else None,
+    }, sort_keys=True).encode("utf-8"))
+    if args.backend == "local":
+        from backend.judge_artifact import MANIFEST_NAME, sha256_file
+        names = [MANIFEST_NAME] if os.path.exists(os.path.join(args.adapter, MANIFEST_NAME)) else sorted(
+            n for n in os.listdir(args.adapter)
+            if n.startswith("adapter_") or n in ("config.json", "model.safetensors")
+        )
+        for name in names:
+            h.update(name.encode("utf-8"))
+            h.update(sha256_file(os.path.join(args.adapter, name)).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def load_cache(path):
+    cache = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    cache[row["id"]] = row
+    return cache
+
+
+# --- Backends ---
+
+def generate_local(samples, batch_size, max_new_tokens):
+    """Yield (sample, text, latency_s, gen_tokens) using length-sorted batches."""
+    import torch
+    from backend import courtroom_logic
+
+    # Generation runs in this process, so undo the one-thread pin the worker pool needs
+    torch.set_num_threads(courtroom_logic.DEFAULT_TORCH_THREADS)
+    courtroom_logic._ensure_local()
+    model, tok = courtroom_logic._local_model, courtroom_logic._local_tok
+    model.eval()
+    tok.padding_side = "left"  # decoder-only models continue from the right edge
+    if tok.pad_token is None:
+        tok.pad_token = tok.eos_token
+    max_prompt = max(1, tok.model_max_length - max_new_tokens)
+
+    lengths = {s["id"]: len(tok(s["prompt"], truncation=True, max_length=max_prompt).input_ids) for s in samples}
+    ordered = sorted(samples, key=lambda s: lengths[s["id"]])
+    for i in range(0, len(ordered), batch_size):
+        batch = ordered[i:i + batch_size]
+        inputs = tok(
+            [s["prompt"] for s in batch],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=max_prompt,
+        ).to(model.device)
+        start = time.perf_counter()
+        with torch.no_grad():
+            out = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tok.pad_token_id,
+            )
+        elapsed = time.perf_counter() - start
+        new_tokens = out[:, inputs["input_ids"].shape[1]:]
+        for sample, row in zip(batch, new_tokens):
+            n = int((row != tok.pad_token_id).sum())
+            # Batch time is shared evenly; a sample's cost is its slice of the batch
+            yield sample, tok.decode(row, skip_special_tokens=True), elapsed / len(batch), n
+
+
+def generate_remote(samples, concurrency, max_new_tokens):
+    """Yield (sample, text, latency_s, gen_tokens) from Groq with at most `concurrency` requests in flight.
+
+    gen_tokens is the completion_tokens count Groq reports for the response.
+    Latency includes any rate-limit waits inside call_llm.
+    """
+    from backend import courtroom_logic
+
+    courtroom_logic.USE_LOCAL_MODEL = False
+
+    def run(sample):
+        usage = {}
+        start = time.perf_counter()
+        text = courtroom_logic.call_llm(sample["prompt"], max_tokens=max_new_tokens, usage=usage)
+        return sample, text, time.perf_counter() - start, usage.get("completion_tokens")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        yield from pool.map(run, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="judge_dataset.jsonl")
+    parser.add_argument("--adapter", default=os.getenv("JUDGE_LORA_PATH", "judge-lora"))
+    parser.add_argument("--backend", choices=["local", "remote"], default="local")
+    parser.add_argument("--eval_percent", type=int, default=DEFAULT_EVAL_PERCENT,
+                        help="Percent of records held out for evaluation (must match fine_tune_judge.py)")
+    parser.add_argument("--limit", type=int, default=None, help="Max held-out records to evaluate")
+    parser.add_argument("--batch_size", type=int, default=8, help="Local generation batch size")
+    parser.add_argument("--concurrency", type=int, default=4, help="Remote requests in flight")
+    parser.add_argument("--max_new_tokens", type=int, default=256, help="Generation cap for either backend")
+    parser.add_argument("--cache_dir", default=".cache/judge_eval")
+    parser.add_argument("--out", default=None, help="Write per-sample results to this JSONL file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.backend == "local":
+        if "/" in args.adapter and not os.path.isdir(args.adapter):
+            from backend.courtroom_logic import _download_judge
+            args.adapter = _download_judge(args.adapter)
+        # courtroom_logic reads the adapter location at load time
+        os.environ["JUDGE_LORA_PATH"] = args.adapter
+
+    samples = load_split(args.data, args.eval_percent, args.limit)
+    print(f"Held-out samples: {len(samples)}")
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    key = checkpoint_key(args)
+    cache_path = os.path.join(args.cache_dir, f"{key}.jsonl")
+    cache = load_cache(cache_path)
+    todo = [s for s in samples if s["id"] not in cache]
+    print(f"Checkpoint {key}: {len(samples) - len(todo)} cached, {len(todo)} to evaluate")
+
+    if todo:
+        if args.backend == "local":
+            results = generate_local(todo, args.batch_size, args.max_new_tokens)
+        else:
+            results = generate_remote(todo, args.concurrency, args.max_new_tokens)
+        errors = 0
+        with open(cache_path, "a", encoding="utf-8") as fcache:
+            for done, (sample, text, latency, gen_tokens) in enumerate(results, 1):
+                if text.startswith("❌"):
+                    # Remote failures are not cached so the next run retries them
+                    errors += 1
+                    print(f"  {sample['id']}: {text[:120]}")
+                    continue
+                row = {
+                    "id": sample["id"],
+                    "prediction": text,
+                    "latency_s": latency,
+                    "gen_tokens": gen_tokens,
+                    **overlap_scores(text, sample["reference"]),
+                }
+                cache[sample["id"]] = row
+                fcache.write(json.dumps(row, ensure_ascii=False) + "\n")
+                fcache.flush()
+                if done % 10 == 0 or done == len(todo):
+                    print(f"  evaluated {done}/{len(todo)}")
+        if errors:
+            print(f"Warning: {errors} samples failed and were skipped")
+
+    rows = [cache[s["id"]] for s in samples if s["id"] in cache]
+    if not rows:
+        print("No results to report.")
+        return
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    latencies = sorted(r["latency_s"] for r in rows)
+    gen_tokens = [r["gen_tokens"] for r in rows if r["gen_tokens"] is not None]
+    print(f"\n=== Judge evaluation ({args.backend}, checkpoint {key}) ===")
+    print(f"Samples:         {len(rows)}")
+    for metric in ("rouge1", "rougeL", "token_f1"):
+        print(f"{metric + ':':<16} {statistics.mean(r[metric] for r in rows):.4f}")
+    print(f"Latency mean:    {statistics.mean(latencies):.2f}s")
+    print(f"Latency p50/p95: {latencies[len(latencies) // 2]:.2f}s / {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.2f}s")
+    if gen_tokens:
+        gen_time = sum(r["latency_s"] for r in rows if r["gen_tokens"] is not None)
+        # Per-request rate: generated tokens over the time each sample took
+        print(f"Tokens/sec:      {sum(gen_tokens) / gen_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
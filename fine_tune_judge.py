@@ -9,25 +9,174 @@ Usage:
 For better results with instruction following, try:
     --base google/flan-t5-base
     --base distilgpt2
+
+Throughput options:
+    --pack                 concatenate examples into full --max_length blocks
+    --group_by_length      batch examples of similar length (ignored with --pack)
+    --num_proc 8           tokenize with 8 worker processes
+    --precision auto       bf16/fp16 on GPU, fp32 on CPU-only boxes
+
+--pack needs transformers>=4.53,<5 (checked on 4.53 and 4.57), where a custom 4D attention mask reaches the
+attention layers unchanged; the model is then loaded with eager attention so
+the additive float mask is applied the same way in every precision.
+
+Records in the evaluate_judge.py held-out split (--eval_percent, default 10)
+are excluded from training; pass --eval_percent 0 to train on everything.
+
+Tokenized datasets are cached under --cache_dir keyed by the data file,
+tokenizer and tokenization settings, so re-runs skip formatting/tokenizing.
 """
 import argparse
+import hashlib
+import json
+import os
+import time
 import torch
-from datasets import load_dataset
+from datasets import load_dataset, load_from_disk
 from transformers import AutoTokenizer, AutoModelForCausalLM, TrainingArguments, Trainer, DataCollatorForLanguageModeling
+import transformers
+from packaging import version
 from peft import LoraConfig, get_peft_model
+from judge_split import DEFAULT_EVAL_PERCENT, is_eval_record
 try:
     import bitsandbytes as bnb  # noqa: F401
 except ImportError:
     print("Warning: bitsandbytes not available, using standard precision")
 
+# First release whose masking utilities pass a 4D attention mask through as-is
+MIN_PACKING_TRANSFORMERS = "4.53.0"
+# Packed training has not been checked against the 5.x masking changes
+MAX_PACKING_TRANSFORMERS = "5.0.0"
+
+
+def resolve_precision(choice):
+    """Pick fp16/bf16 flags for TrainingArguments that match the hardware."""
+    if choice == "auto":
+        if not torch.cuda.is_available():
+            choice = "fp32"
+        elif torch.cuda.is_bf16_supported():
+            choice = "bf16"
+        else:
+            choice = "fp16"
+    if choice in ("fp16", "bf16") and not torch.cuda.is_available():
+        print(f"Warning: {choice} requested but no CUDA device found, falling back to fp32")
+        choice = "fp32"
+    return choice, {"fp16": choice == "fp16", "bf16": choice == "bf16"}
+
+
+def dataset_cache_key(data_path, tokenizer, max_length, pack, eval_percent):
+    """Hash the data file, tokenizer and tokenization settings into a cache key."""
+    h = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    tok_state = backend.to_str() if backend is not None else json.dumps(tokenizer.get_vocab(), sort_keys=True)
+    h.update(tok_state.encode("utf-8"))
+    h.update(json.dumps({
+        "name": tokenizer.name_or_path,
+        "special_tokens": tokenizer.special_tokens_map,
+        "chat_template": getattr(tokenizer, "chat_template", None),
+        "max_length": max_length,
+        "pack": pack,
+        "eval_percent": eval_percent,
+    }, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def pack_examples(examples, max_length):
+    """Concatenate tokenized examples into full max_length blocks.
+
+    Each block keeps a per-token segment id and restarts position ids at every
+    example boundary so the collator can build a block-diagonal causal mask;
+    the first token of each segment gets no label so nothing is predicted
+    across documents.
+    """
+    blocks = {"input_ids": [], "segment_ids": [], "position_ids": [], "labels": []}
+    ids, segs, pos, labels = [], [], [], []
+    seg = 0
+
+    def flush():
+        if ids:
+            blocks["input_ids"].append(ids)
+            blocks["segment_ids"].append(segs)
+            blocks["position_ids"].append(pos)
+            blocks["labels"].append(labels)
+
+    for example in examples["input_ids"]:
+        example = example[:max_length]
+        if len(ids) + len(example) > max_length:
+            flush()
+            ids, segs, pos, labels = [], [], [], []
+        seg += 1
+        ids = ids + example
+        segs = segs + [seg] * len(example)
+        pos = pos + list(range(len(example)))
+        labels = labels + [-100] + example[1:]
+    flush()
+    return blocks
+
+
+class PackedCollator:
+    """Pad packed blocks and build a 4D block-diagonal causal attention mask.
+
+    The mask is in the additive float form the attention layers add to the
+    scores: 0.0 where a token may attend, the dtype minimum elsewhere. Padding
+    positions attend to themselves only, so no row is fully masked (which
+    would turn into NaN in the softmax); their labels are -100 anyway.
+    """
+
+    def __init__(self, pad_token_id, dtype=torch.float32):
+        self.pad_token_id = pad_token_id
+        self.dtype = dtype
+
+    def __call__(self, features):
+        width = max(len(f["input_ids"]) for f in features)
+
+        def pad(key, value):
+            return [f[key] + [value] * (width - len(f[key])) for f in features]
+
+        segments = torch.tensor(pad("segment_ids", 0))
+        same_segment = segments[:, :, None] == segments[:, None, :]
+        causal = torch.tril(torch.ones(width, width, dtype=torch.bool))
+        padding = (segments == 0)[:, :, None]
+        allowed = same_segment & causal & ~padding
+        allowed |= torch.eye(width, dtype=torch.bool)
+        attention_mask = torch.zeros(allowed.shape, dtype=self.dtype)
+        attention_mask.masked_fill_(~allowed, torch.finfo(self.dtype).min)
+        attention_mask = attention_mask[:, None, :, :]
+        return {
+            "input_ids": torch.tensor(pad("input_ids", self.pad_token_id)),
+            "position_ids": torch.tensor(pad("position_ids", 0)),
+            "labels": torch.tensor(pad("labels", -100)),
+            "attention_mask": attention_mask,
+        }
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--data", default="judge_dataset.jsonl")
     parser.add_argument("--base", default="distilgpt2")
     parser.add_argument("--output", default="judge-lora")
     parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--max_length", type=int, default=512)
+    parser.add_argument("--pack", action="store_true", help="Pack examples into full max_length blocks")
+    parser.add_argument("--group_by_length", action="store_true", help="Batch examples of similar length")
+    parser.add_argument("--num_proc", type=int, default=1, help="Worker processes for formatting/tokenizing")
+    parser.add_argument("--cache_dir", default=".cache/judge_tokenized", help="Tokenized dataset cache")
+    parser.add_argument("--no_cache", action="store_true", help="Always re-tokenize the dataset")
+    parser.add_argument("--eval_percent", type=int, default=DEFAULT_EVAL_PERCENT,
+                        help="Percent of records held out for evaluate_judge.py and excluded from training")
+    parser.add_argument("--precision", choices=["auto", "fp32", "fp16", "bf16"], default="auto")
     args = parser.parse_args()
 
+    tf_version = version.parse(transformers.__version__)
+    if args.pack and not version.parse(MIN_PACKING_TRANSFORMERS) <= tf_version < version.parse(MAX_PACKING_TRANSFORMERS):
+        print(f"\nERROR: --pack needs transformers>={MIN_PACKING_TRANSFORMERS},<{MAX_PACKING_TRANSFORMERS} "
+              f"(found {transformers.__version__}).")
+        print('Install a supported version with: pip install "transformers>=4.53,<5", or train without --pack')
+        exit(1)
+
     dataset = load_dataset("json", data_files=args.data, split="train")
 
     try:
@@ -58,9 +207,44 @@ def main():
                     formatted += f"Assistant: {msg['content']}"
             return formatted
 
-    print("Formatting dataset...")
-    dataset = dataset.map(lambda x: {"text": fmt(x)}, remove_columns=dataset.column_names)
-    print(f"Dataset formatted. Sample count: {len(dataset)}")
+    num_proc = args.num_proc if args.num_proc > 1 else None
+    cache_path = os.path.join(args.cache_dir, dataset_cache_key(args.data, tokenizer, args.max_length, args.pack, args.eval_percent))
+    if not args.no_cache and os.path.isdir(cache_path):
+        print(f"Loading tokenized dataset from cache: {cache_path}")
+        tokenized_dataset = load_from_disk(cache_path)
+    else:
+        if args.eval_percent > 0:
+            total = len(dataset)
+            dataset = dataset.filter(lambda ex: not is_eval_record(ex["messages"], args.eval_percent), num_proc=num_proc)
+            print(f"Held out {total - len(dataset)} of {total} records for evaluation")
+        print("Formatting dataset...")
+        dataset = dataset.map(lambda x: {"text": fmt(x)}, remove_columns=dataset.column_names, num_proc=num_proc)
+        print(f"Dataset formatted. Sample count: {len(dataset)}")
+
+        def tokenize_function(examples):
+            if args.pack:
+                # Each example ends with EOS so packed documents stay delimited
+                texts = [t + tokenizer.eos_token for t in examples["text"]]
+                return tokenizer(texts, truncation=True, padding=False, max_length=args.max_length)
+            out = tokenizer(examples["text"], truncation=True, padding=False, max_length=args.max_length)
+            out["length"] = [len(ids) for ids in out["input_ids"]]
+            return out
+
+        print("Tokenizing dataset...")
+        tokenized_dataset = dataset.map(tokenize_function, batched=True, remove_columns=dataset.column_names, num_proc=num_proc)
+        if args.pack:
+            print(f"Packing into {args.max_length}-token blocks...")
+            tokenized_dataset = tokenized_dataset.map(
+                lambda batch: pack_examples(batch, args.max_length),
+                batched=True,
+                batch_size=1000,
+                remove_columns=tokenized_dataset.column_names,
+                num_proc=num_proc,
+            )
+        if not args.no_cache:
+            tokenized_dataset.save_to_disk(cache_path)
+            print(f"Tokenized dataset cached at: {cache_path}")
+    print(f"Training samples: {len(tokenized_dataset)}")
 
     # Load model without quantization for better compatibility
     try:
@@ -69,6 +253,8 @@ def main():
             args.base,
             torch_dtype="auto",
             device_map="auto" if torch.cuda.is_available() else None,
+            # Eager attention adds the packed float mask directly to the scores
+            **({"attn_implementation": "eager"} if args.pack else {}),
         )
         print(f"Model loaded successfully. Parameters: {model.num_parameters():,}")
     except OSError as e:
@@ -91,39 +277,60 @@ def main():
     print(f"Applying LoRA to target modules: {peft_cfg.target_modules}")
     model = get_peft_model(model, peft_cfg)
 
+    precision, precision_flags = resolve_precision(args.precision)
+    print(f"Training precision: {precision}")
+    group_by_length = args.group_by_length and not args.pack
+    if args.group_by_length and args.pack:
+        print("Note: --group_by_length has no effect with --pack (blocks are already full length)")
+
     training_args = TrainingArguments(
         output_dir=args.output,
         per_device_train_batch_size=4,
         gradient_accumulation_steps=8,
         learning_rate=2e-4,
         num_train_epochs=args.epochs,
-        fp16=True,
         logging_steps=10,
         save_strategy="epoch",
+        group_by_length=group_by_length,
+        length_column_name="length",
+        dataloader_num_workers=min(args.num_proc, 4) if args.num_proc > 1 else 0,
+        # Packed blocks carry segment/position ids the collator needs
+        remove_unused_columns=not args.pack,
+        **precision_flags,
     )
 
-    # Tokenize the dataset
-    def tokenize_function(examples):
-        return tokenizer(examples["text"], truncation=True, padding=False, max_length=512)
-    
-    print("Tokenizing dataset...")
-    tokenized_dataset = dataset.map(tokenize_function, batched=True, remove_columns=dataset.column_names)
-    
-    # Data collator for language modeling
-    data_collator = DataCollatorForLanguageModeling(
-        tokenizer=tokenizer,
-        mlm=False,  # We're doing causal language modeling, not masked
-    )
-    
+    if args.pack:
+        data_collator = PackedCollator(tokenizer.pad_token_id)
+    else:
+        # Data collator for language modeling
+        data_collator = DataCollatorForLanguageModeling(
+            tokenizer=tokenizer,
+            mlm=False,  # We're doing causal language modeling, not masked
+        )
+
     trainer = Trainer(
-        model=model, 
-        args=training_args, 
+        model=model,
+        args=training_args,
         train_dataset=tokenized_dataset,
         data_collator=data_collator
     )
-    
+
     print("Starting training...")
-    trainer.train()
+    start = time.perf_counter()
+    train_result = trainer.train()
+    elapsed = time.perf_counter() - start
+
+    if args.pack:
+        tokens_per_epoch = sum(sum(1 for s in segs if s) for segs in tokenized_dataset["segment_ids"])
+    else:
+        tokens_per_epoch = sum(tokenized_dataset["length"])
+    samples = len(tokenized_dataset) * args.epochs
+    tokens = tokens_per_epoch * args.epochs
+    print("\n=== Training throughput ===")
+    print(f"Mode:            {'packed' if args.pack else 'grouped' if group_by_length else 'unpacked'} ({precision})")
+    print(f"Wall time:       {elapsed:.1f}s")
+    print(f"Samples/sec:     {train_result.metrics.get('train_samples_per_second', samples / elapsed):.2f}")
+    print(f"Tokens/sec:      {tokens / elapsed:.1f} ({tokens:,} non-pad tokens)")
 
     model.save_pretrained(args.output)
     tokenizer.save_pretrained(args.output)
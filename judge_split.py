@@ -0,0 +1,16 @@
+"""Train / held-out split shared by fine_tune_judge.py and evaluate_judge.py.
+
+A record belongs to the eval split when a hash of its case text (the user
+message) falls below eval_percent. Hashing the content instead of using the
+line position keeps the split identical when prepare_dataset.py regenerates
+or reorders the JSONL, so training never sees the records evaluation scores.
+"""
+import zlib
+
+DEFAULT_EVAL_PERCENT = 10
+
+
+def is_eval_record(messages, eval_percent=DEFAULT_EVAL_PERCENT):
+    """Return True if a prepare_dataset.py record is held out for evaluation."""
+    user = next(m["content"] for m in messages if m["role"] == "user")
+    return zlib.crc32(user.encode("utf-8")) % 100 < eval_percent
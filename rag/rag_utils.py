@@ -31,10 +31,13 @@ INDEX_PATH = os.path.join(EMB_DIR, "index.faiss")
 
 def build_faiss_index(chunks, index_path: str = INDEX_PATH):
     """Build a FAISS vector index from text chunks and persist it to disk."""
+    embeddings = embedding_model.encode(chunks, normalize_embeddings=True)
+    write_faiss_index(embeddings, chunks, index_path)
+
+def write_faiss_index(embeddings, chunks, index_path: str = INDEX_PATH):
+    """Persist precomputed chunk embeddings and their texts in the layout search_top_chunks reads."""
     # Ensure embeddings directory exists
     os.makedirs(os.path.dirname(index_path), exist_ok=True)
-
-    embeddings = embedding_model.encode(chunks, normalize_embeddings=True)
     index = faiss.IndexFlatL2(len(embeddings[0]))
     index.add(np.array(embeddings).astype("float32"))
     faiss.write_index(index, index_path)
@@ -0,0 +1,126 @@
+"""
+Compare memory and throughput of the local judge worker pool against the
+single-process path.
+
+The pool is measured first: the parent loads the model, forks the workers and
+all prompts are submitted at once. Its workers are then stopped and the same
+prompts run one after another in the parent. Finally, prosecution and defense
+prompts for each case are run in the parent with and without the shared case
+prefix, to show what the prefix KV cache saves. Memory is read from /proc, so the
+PSS figures (shared pages split between processes) are Linux-only.
+
+Usage:
+    python scripts/bench_local_workers.py --workers 4 --prompts 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import courtroom_logic
+from backend.judge_workers import LocalJudgePool, _memory_kb, available_cpus
+
+SAMPLE_CASE = """CASE:
+The accused was found in possession of 500 grams of cannabis during a police
+search at his residence. He claims it was for personal medicinal use due to
+chronic pain. There is no evidence of sale and no prior criminal record.
+
+LEGAL REFERENCES (if any):
+"""
+
+
+def _fmt_mb(value):
+    return f"{value:8.1f} MB" if value is not None else "     n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the local judge worker pool against the single-process path"
+    )
+    parser.add_argument("--workers", type=int, default=max(2, available_cpus() // 4))
+    parser.add_argument("--prompts", type=int, default=8, help="Number of generate requests per run")
+    args = parser.parse_args()
+
+    if not LocalJudgePool.supported():
+        print("❌ Worker pool needs fork() and a CPU-only model on this machine")
+        return
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    template = courtroom_logic.load_prompt(os.path.join(base_dir, "prompts", "prosecution.txt"))
+    defense_template = courtroom_logic.load_prompt(os.path.join(base_dir, "prompts", "defense.txt"))
+    # Distinct cases so every request is a separate prompt; these runs pass no prefix
+    cases = [f"{SAMPLE_CASE}(request {i})\n" for i in range(args.prompts)]
+    prompts = [courtroom_logic.fill_prompt(template, case=c) for c in cases]
+
+    # Same constraint as the app: one intra-op thread in the parent until the workers are forked
+    parent_threads = courtroom_logic.DEFAULT_TORCH_THREADS
+    torch.set_num_threads(1)
+    print("📥 Loading model in parent...")
+    courtroom_logic._ensure_local()
+    courtroom_logic._local_model.eval()
+    loaded_rss, _ = _memory_kb(os.getpid())
+
+    # Pool first: forking after the parent has run multi-threaded torch ops can hang OpenMP in the children
+    pool = LocalJudgePool(courtroom_logic._local_generate, args.workers)
+    start = time.perf_counter()
+    futures = [pool.submit(p) for p in prompts]
+    for f in futures:
+        f.result()
+    pool_elapsed = time.perf_counter() - start
+    pool_memory = pool.memory_report()
+    pool.close()
+
+    torch.set_num_threads(parent_threads)
+    start = time.perf_counter()
+    for p in prompts:
+        courtroom_logic._local_generate(p)
+    single_elapsed = time.perf_counter() - start
+    single_rss, single_pss = _memory_kb(os.getpid())
+
+    # Prefix reuse: prosecution + defense for each case, as run_courtroom issues them,
+    # with and without the shared case prefix (the KV cache from user-028)
+    pairs = [
+        (courtroom_logic.fill_prompt(template, case=c), courtroom_logic.fill_prompt(defense_template, case=c))
+        for c in cases
+    ]
+    start = time.perf_counter()
+    for prosecution, defense in pairs:
+        courtroom_logic._local_generate(prosecution)
+        courtroom_logic._local_generate(defense)
+    no_prefix_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for prosecution, defense in pairs:
+        prefix = courtroom_logic.shared_prefix(prosecution, defense)
+        courtroom_logic._local_generate(prosecution, prefix)
+        courtroom_logic._local_generate(defense, prefix)
+    prefix_elapsed = time.perf_counter() - start
+
+    print("\n=== Local judge: single process vs worker pool ===")
+    print(f"Requests:            {args.prompts}")
+    print(f"Model loaded RSS:    {_fmt_mb(loaded_rss / 1024 if loaded_rss else None)}")
+    print(f"\nSingle process ({torch.get_num_threads()} threads)")
+    print(f"  wall time          {single_elapsed:8.1f} s")
+    print(f"  requests/sec       {args.prompts / single_elapsed:8.2f}")
+    print(f"  RSS / PSS          {_fmt_mb(single_rss / 1024 if single_rss else None)} / {_fmt_mb(single_pss / 1024 if single_pss else None)}")
+    print(f"\nWorker pool ({args.workers} workers x {pool.threads_per_worker} threads)")
+    print(f"  wall time          {pool_elapsed:8.1f} s")
+    print(f"  requests/sec       {args.prompts / pool_elapsed:8.2f}")
+    for name, row in pool_memory.items():
+        if name == "total_pss_mb":
+            continue
+        print(f"  {name:<18} RSS {_fmt_mb(row['rss_mb'])}  PSS {_fmt_mb(row['pss_mb'])}")
+    print(f"  total PSS          {_fmt_mb(pool_memory['total_pss_mb'])}")
+    print(f"\nSpeedup:             {single_elapsed / pool_elapsed:8.2f}x")
+    print(f"\nShared case prefix (single process, {len(pairs)} prosecution/defense pairs)")
+    print(f"  without prefix     {no_prefix_elapsed:8.1f} s")
+    print(f"  with prefix cache  {prefix_elapsed:8.1f} s")
+    print(f"  saved              {no_prefix_elapsed - prefix_elapsed:8.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Build a minimal, deployable judge artifact from a trained LoRA adapter.
+
+The training output folder (judge-lora) also holds checkpoints with optimizer
+and RNG state and TensorBoard runs/ logs, none of which inference uses. This
+script exports only the adapter (or the base model with the adapter merged
+in) as safetensors, the tokenizer files and a judge_manifest.json with a
+sha256 for every file. The loader in backend/courtroom_logic.py checks a
+local copy against that manifest and skips the network when it matches.
+
+Usage:
+    python scripts/build_judge_artifact.py --model_path judge-lora --output judge-artifact
+    python scripts/build_judge_artifact.py --merge --dtype float16 --output judge-artifact
+
+Then upload the artifact instead of the training folder:
+    python scripts/upload_model_to_hf.py --model_path judge-artifact --repo_name your-username/genai-courtroom-judge
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.judge_artifact import TOKENIZER_FILES, write_manifest
+
+DTYPES = {"float32": torch.float32, "float16": torch.float16, "bfloat16": torch.bfloat16}
+
+
+def export_adapter(model_path: str, output: str, dtype: str):
+    """Copy the adapter config and write its weights as safetensors in the given dtype."""
+    from safetensors.torch import load_file, save_file
+
+    shutil.copy2(os.path.join(model_path, "adapter_config.json"), output)
+    st_path = os.path.join(model_path, "adapter_model.safetensors")
+    bin_path = os.path.join(model_path, "adapter_model.bin")
+    if os.path.exists(st_path):
+        weights = load_file(st_path)
+    elif os.path.exists(bin_path):
+        weights = torch.load(bin_path, map_location="cpu", weights_only=True)
+    else:
+        raise FileNotFoundError(f"No adapter_model.safetensors or adapter_model.bin in '{model_path}'")
+    weights = {k: v.to(DTYPES[dtype]).contiguous() for k, v in weights.items()}
+    save_file(weights, os.path.join(output, "adapter_model.safetensors"), metadata={"format": "pt"})
+
+
+def export_merged(model_path: str, base_model: str, output: str, dtype: str):
+    """Merge the adapter into the base model and save the result as safetensors."""
+    from transformers import AutoModelForCausalLM
+    from peft import PeftModel
+
+    # Merge in float32 so the low-rank update is not rounded before it is added
+    base = AutoModelForCausalLM.from_pretrained(base_model, torch_dtype=torch.float32)
+    merged = PeftModel.from_pretrained(base, model_path).merge_and_unload()
+    merged = merged.to(DTYPES[dtype])
+    merged.save_pretrained(output, safe_serialization=True)
+
+
+def build_artifact(model_path: str, output: str, merge: bool = False, dtype: str = "float32"):
+    """
+    Export only the files inference needs and write a checksum manifest.
+
+    Args:
+        model_path: Local path to the trained adapter directory (e.g., 'judge-lora')
+        output: Directory to write the artifact to (replaced if it exists)
+        merge: Merge the adapter into the base weights instead of exporting it alone
+        dtype: Storage precision for the exported weights
+    """
+    from peft import PeftConfig
+    from transformers import AutoTokenizer
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model path '{model_path}' does not exist")
+
+    cfg = PeftConfig.from_pretrained(model_path)
+    print(f"📦 Building {'merged' if merge else 'adapter'} artifact from: {model_path}")
+    print(f"🧱 Base model: {cfg.base_model_name_or_path}")
+    print(f"🔢 Weights dtype: {dtype}")
+
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+
+    if merge:
+        export_merged(model_path, cfg.base_model_name_or_path, output, dtype)
+    else:
+        export_adapter(model_path, output, dtype)
+
+    # Prefer the tokenizer saved with the adapter; fall back to the base model's
+    has_tokenizer = any(os.path.exists(os.path.join(model_path, f)) for f in TOKENIZER_FILES)
+    tokenizer = AutoTokenizer.from_pretrained(model_path if has_tokenizer else cfg.base_model_name_or_path)
+    tokenizer.save_pretrained(output)
+
+    manifest = write_manifest(output, "merged" if merge else "adapter", cfg.base_model_name_or_path, dtype)
+    total = sum(meta["size"] for meta in manifest["files"].values())
+    print(f"\n✅ Artifact written to: {output}")
+    for rel, meta in sorted(manifest["files"].items()):
+        print(f"   {rel:<32} {meta['size'] / 1e6:8.2f} MB")
+    print(f"   {'total':<32} {total / 1e6:8.2f} MB")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a minimal deployable judge artifact with a checksum manifest"
+    )
+    parser.add_argument(
+        "--model_path",
+        type=str,
+        default="judge-lora",
+        help="Local path to the trained adapter directory"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="judge-artifact",
+        help="Output directory for the artifact"
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Merge the adapter into the base model so no base download is needed at startup"
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=sorted(DTYPES),
+        default="float32",
+        help="Storage precision for the exported weights"
+    )
+
+    args = parser.parse_args()
+    build_artifact(
+        model_path=args.model_path,
+        output=args.output,
+        merge=args.merge,
+        dtype=args.dtype
+    )
+
+
+if __name__ == "__main__":
+    main()
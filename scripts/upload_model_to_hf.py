@@ -11,6 +11,10 @@ Prerequisites:
     1. Install huggingface-hub: pip install huggingface-hub
     2. Login to HuggingFace: huggingface-cli login
     3. Create a model repository on https://huggingface.co/new
+
+For the smallest download at startup, build an artifact first and upload that:
+    python scripts/build_judge_artifact.py --model_path judge-lora --output judge-artifact
+    python scripts/upload_model_to_hf.py --model_path judge-artifact --repo_name your-username/genai-courtroom-judge
 """
 
 import argparse
@@ -52,7 +56,7 @@ def upload_model_to_hub(model_path: str, repo_name: str, private: bool = False):
         print(f"⚠️  Repository creation warning: {e}")
         print("Continuing with upload...")
     
-    # Upload all files in the model directory
+    # Upload the model directory, skipping training-only state
     print(f"\n📤 Uploading files from {model_path}...")
     
     try:
@@ -60,6 +64,7 @@ def upload_model_to_hub(model_path: str, repo_name: str, private: bool = False):
             folder_path=model_path,
             repo_id=repo_name,
             repo_type="model",
+            ignore_patterns=["checkpoint-*/**", "runs/**"],
         )
         print("\n✅ Upload complete!")
         print(f"\n🎉 Your model is now available at: https://huggingface.co/{repo_name}")
@@ -0,0 +1,37 @@
+"""Checks for the bulk corpus ingestion helpers."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_corpus_index import chunk_pages, collect_pdfs, source_id  # noqa: E402
+
+
+def test_chunk_pages_keeps_page_spans():
+    chunks = chunk_pages(["a b c", "d e", "", "f g h i"], chunk_size=3)
+    assert chunks == [("a b c", 1, 1), ("d e f", 2, 4), ("g h i", 4, 4)]
+
+
+def test_chunk_pages_matches_word_chunking_and_handles_empty_documents():
+    pages = ["one two three four", "five six seven"]
+    assert [c for c, _, _ in chunk_pages(pages, chunk_size=2)] == ["one two", "three four", "five six", "seven"]
+    assert chunk_pages([]) == []
+    assert chunk_pages(["", "  "]) == []
+
+
+def test_collect_pdfs_walks_directories_and_list_files(tmp_path):
+    (tmp_path / "corpus" / "nested").mkdir(parents=True)
+    for rel in ("corpus/a.pdf", "corpus/nested/B.PDF", "corpus/notes.txt", "other.pdf"):
+        (tmp_path / rel).write_bytes(b"")
+    list_file = tmp_path / "pdfs.txt"
+    list_file.write_text(f"{tmp_path / 'other.pdf'}\n\n{tmp_path / 'corpus' / 'a.pdf'}\n", encoding="utf-8")
+
+    found = collect_pdfs([str(tmp_path / "corpus")], str(list_file))
+    assert found == sorted(str(tmp_path / rel) for rel in ("corpus/a.pdf", "corpus/nested/B.PDF", "other.pdf"))
+
+
+def test_source_id_does_not_depend_on_other_inputs(tmp_path):
+    root = tmp_path / "corpus"
+    assert source_id(str(root / "sc" / "judgment.pdf"), str(root)) == "sc/judgment.pdf"
+    outside = tmp_path / "elsewhere" / "act.pdf"
+    assert source_id(str(outside), str(root)) == str(outside).replace(os.sep, "/")
@@ -0,0 +1,59 @@
+"""Checks for sequence packing in fine_tune_judge.py."""
+import os
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("datasets")
+pytest.importorskip("peft")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fine_tune_judge import PackedCollator, pack_examples  # noqa: E402
+
+PAD = 0
+
+
+def tiny_gpt2():
+    torch.manual_seed(0)
+    cfg = transformers.GPT2Config(
+        vocab_size=64, n_positions=32, n_embd=16, n_layer=2, n_head=2, attn_implementation="eager",
+    )
+    return transformers.GPT2LMHeadModel(cfg).eval()
+
+
+def test_pack_examples_restarts_positions_and_masks_boundary_labels():
+    packed = pack_examples({"input_ids": [[1, 2, 3], [4, 5], [6, 7, 8, 9], [10]]}, 5)
+    assert packed["input_ids"] == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]]
+    assert packed["segment_ids"] == [[1, 1, 1, 2, 2], [3, 3, 3, 3, 4]]
+    assert packed["position_ids"] == [[0, 1, 2, 0, 1], [0, 1, 2, 3, 0]]
+    assert packed["labels"] == [[-100, 2, 3, -100, 5], [-100, 7, 8, 9, -100]]
+
+
+def test_packed_batch_loss_is_finite_with_padding():
+    packed = pack_examples({"input_ids": [[5, 6, 7], [8, 9], [10, 11, 12, 13], [14, 15]]}, 6)
+    features = [{k: packed[k][i] for k in packed} for i in range(len(packed["input_ids"]))]
+    batch = PackedCollator(PAD)(features)
+    # The first block is shorter, so the batch contains padding rows
+    assert len(packed["input_ids"][0]) < batch["input_ids"].shape[1]
+
+    model = tiny_gpt2().train()
+    loss = model(**batch).loss
+    loss.backward()
+    assert torch.isfinite(loss)
+    assert all(torch.isfinite(p.grad).all() for p in model.parameters() if p.grad is not None)
+
+
+def test_packed_segments_do_not_attend_across_boundaries():
+    first, second = [5, 6, 7], [8, 9, 10, 11]
+    packed = pack_examples({"input_ids": [first, second]}, 8)
+    features = [{k: packed[k][0] for k in packed}]
+    model = tiny_gpt2()
+    with torch.no_grad():
+        batch = PackedCollator(PAD)(features)
+        batch.pop("labels")
+        packed_logits = model(**batch).logits[0, len(first):]
+        alone_logits = model(input_ids=torch.tensor([second])).logits[0]
+    assert torch.allclose(packed_logits, alone_logits, atol=1e-5)
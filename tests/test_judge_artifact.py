@@ -0,0 +1,43 @@
+"""Checks for the judge artifact manifest."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.judge_artifact import MANIFEST_NAME, load_manifest, verify_manifest, write_manifest  # noqa: E402
+
+
+def make_artifact(tmp_path):
+    (tmp_path / "adapter_config.json").write_text('{"r": 16}', encoding="utf-8")
+    (tmp_path / "adapter_model.safetensors").write_bytes(b"\x00" * 64)
+    write_manifest(str(tmp_path), "adapter", "distilgpt2", "float16")
+    return tmp_path
+
+
+def test_matching_copy_passes_both_checks(tmp_path):
+    artifact = make_artifact(tmp_path)
+    manifest = load_manifest(str(artifact))
+    assert MANIFEST_NAME not in manifest["files"]
+    assert set(manifest["files"]) == {"adapter_config.json", "adapter_model.safetensors"}
+    assert verify_manifest(str(artifact)) == []
+    assert verify_manifest(str(artifact), checksums=True) == []
+
+
+def test_missing_manifest_and_missing_file_are_reported(tmp_path):
+    assert verify_manifest(str(tmp_path)) == [f"{MANIFEST_NAME} missing"]
+    artifact = make_artifact(tmp_path)
+    (artifact / "adapter_config.json").unlink()
+    assert verify_manifest(str(artifact)) == ["adapter_config.json missing"]
+
+
+def test_size_mismatch_is_reported_without_checksums(tmp_path):
+    artifact = make_artifact(tmp_path)
+    (artifact / "adapter_model.safetensors").write_bytes(b"\x00" * 32)
+    assert verify_manifest(str(artifact)) == ["adapter_model.safetensors size mismatch"]
+
+
+def test_same_size_corruption_needs_checksums(tmp_path):
+    artifact = make_artifact(tmp_path)
+    (artifact / "adapter_model.safetensors").write_bytes(b"\x01" * 64)
+    assert verify_manifest(str(artifact)) == []
+    assert verify_manifest(str(artifact), checksums=True) == ["adapter_model.safetensors checksum mismatch"]
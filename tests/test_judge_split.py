@@ -0,0 +1,34 @@
+"""Checks that training and evaluation agree on the held-out split."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluate_judge import load_split  # noqa: E402
+from judge_split import is_eval_record  # noqa: E402
+
+
+def record(i):
+    return {"messages": [
+        {"role": "system", "content": "You are a judge."},
+        {"role": "user", "content": f"Case facts number {i}"},
+        {"role": "assistant", "content": f"Verdict {i}"},
+    ]}
+
+
+def test_split_is_deterministic_and_near_requested_size():
+    held_out = [i for i in range(1000) if is_eval_record(record(i)["messages"], 10)]
+    assert held_out == [i for i in range(1000) if is_eval_record(record(i)["messages"], 10)]
+    assert 50 < len(held_out) < 150
+    assert not any(is_eval_record(record(i)["messages"], 0) for i in range(1000))
+
+
+def test_load_split_returns_exactly_the_held_out_records(tmp_path):
+    path = tmp_path / "judge_dataset.jsonl"
+    records = [record(i) for i in range(300)]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n", encoding="utf-8")
+
+    references = {s["reference"] for s in load_split(str(path), 10)}
+    expected = {r["messages"][2]["content"] for r in records if is_eval_record(r["messages"], 10)}
+    assert references == expected